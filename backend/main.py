@@ -1,17 +1,19 @@
 """
 二维码投票系统 - FastAPI 后端
 """
-import re
 import os
 import json
 import uuid
 import asyncio
+import secrets
 from datetime import datetime
 from typing import Dict, List, Optional, Set
 from contextlib import asynccontextmanager
 
+import orjson
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field, field_validator
 
 
@@ -19,35 +21,45 @@ from pydantic import BaseModel, Field, field_validator
 
 CONFIG_FILE_PATH = os.path.join(os.path.dirname(__file__), "rounds_config.json")
 
+# 配置缓存: (文件mtime, 解析结果)，文件未变化时不重复读盘
+_rounds_config_cache = (None, None)
+
 def load_rounds_config():
-    """加载轮次配置文件"""
+    """加载轮次配置文件（按mtime缓存，文件修改后自动重新加载）"""
+    global _rounds_config_cache
     try:
-        with open(CONFIG_FILE_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
+        mtime = os.stat(CONFIG_FILE_PATH).st_mtime
+    except OSError:
         return {"rounds": {}, "default_options": ["选项A", "选项B"]}
-    except json.JSONDecodeError:
+    cached_mtime, cached_config = _rounds_config_cache
+    if cached_mtime == mtime:
+        return cached_config
+    try:
+        with open(CONFIG_FILE_PATH, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError):
         return {"rounds": {}, "default_options": ["选项A", "选项B"]}
+    _rounds_config_cache = (mtime, config)
+    return config
+
+def get_round_entry(round_num: int) -> dict:
+    """获取指定轮次的配置条目（选项和标题共享同一次加载）"""
+    return load_rounds_config().get("rounds", {}).get(str(round_num), {})
 
 def get_round_options(round_num: int) -> Optional[List[str]]:
     """获取指定轮次的预设选项"""
-    config = load_rounds_config()
-    round_key = str(round_num)
-    if round_key in config.get("rounds", {}):
-        return config["rounds"][round_key].get("options")
-    return None
+    return get_round_entry(round_num).get("options")
 
 def get_round_title(round_num: int) -> Optional[str]:
     """获取指定轮次的标题"""
-    config = load_rounds_config()
-    round_key = str(round_num)
-    if round_key in config.get("rounds", {}):
-        return config["rounds"][round_key].get("title")
-    return None
+    return get_round_entry(round_num).get("title")
 
 
 # ==================== 数据模型 ====================
 
+# 用户名中禁止出现的特殊字符（集合求交比正则更快）
+_NAME_FORBIDDEN_CHARS = frozenset('<>"\'/\\;&|`$')
+
 class UserRegisterRequest(BaseModel):
     """用户注册请求"""
     name: str = Field(..., min_length=1, max_length=20, description="用户姓名")
@@ -60,7 +72,7 @@ class UserRegisterRequest(BaseModel):
         if not v:
             raise ValueError('姓名不能为空')
         # 校验特殊字符
-        if re.search(r'[<>"\'/\\;&|`$]', v):
+        if not _NAME_FORBIDDEN_CHARS.isdisjoint(v):
             raise ValueError('姓名包含非法字符')
         return v
 
@@ -77,18 +89,12 @@ class UserRegisterResponse(BaseModel):
 class VoteRequest(BaseModel):
     """投票请求"""
     token: str = Field(..., description="用户令牌")
-    option_id: str = Field(..., description="选项ID")
-
-
-class VoteResponse(BaseModel):
-    """投票响应"""
-    success: bool
-    message: str
+    option_id: int = Field(..., description="选项ID")
 
 
 class VoteOption(BaseModel):
     """投票选项"""
-    id: str
+    id: int
     name: str
     votes: int = 0
 
@@ -112,6 +118,18 @@ class NextRoundRequest(BaseModel):
 
 # ==================== 数据存储（内存存储，生产环境应使用数据库） ====================
 
+class UserRecord:
+    """单个用户记录（__slots__紧凑存储，省去每用户一个字典的开销）"""
+    __slots__ = ("name", "voted", "vote_option", "eliminated", "joined_at")
+
+    def __init__(self, name: str, joined_at: str):
+        self.name = name
+        self.voted = False
+        self.vote_option: Optional[int] = None
+        self.eliminated = False
+        self.joined_at = joined_at
+
+
 class DataStore:
     """内存数据存储"""
     def __init__(self):
@@ -119,41 +137,81 @@ class DataStore:
     
     def reset(self):
         """重置所有数据"""
-        # 用户数据: {token: {"name": str, "voted": bool, "vote_option": str, "eliminated": bool}}
-        self.users: Dict[str, dict] = {}
-        # 投票选项: {option_id: VoteOption}
-        self.options: Dict[str, VoteOption] = {}
+        # 用户数据: {token: UserRecord}
+        self.users: Dict[str, UserRecord] = {}
+        # 用户名反向索引: {小写用户名: token}，注册查重O(1)
+        self.names_to_token: Dict[str, str] = {}
+        # 投票选项: {option_id: {"id": int, "name": str, "votes": int}}，直接可JSON序列化
+        self.options: Dict[int, dict] = {}
         # 游戏状态
         self.game_status: str = "waiting"  # waiting, voting, result
         # 当前轮次
         self.round: int = 1
         # 被淘汰的用户token
         self.eliminated_users: Set[str] = set()
+        # 运行计数器：未淘汰用户数 / 本轮已投票数（避免每次请求扫描全体用户）
+        self.active_count: int = 0
+        self.voted_count: int = 0
         # 每轮历史记录
         self.round_history: List[dict] = []
         # 会话ID（二维码刷新用）
         self.session_id: str = str(uuid.uuid4())[:8]
+        # 全量用户快照缓存（用户状态变化时失效，读取时惰性重建）
+        self._users_snapshot: Optional[List[dict]] = None
+        # 主持人init消息的序列化缓存（任一游戏状态变化时失效）
+        self._host_init_text: Optional[str] = None
     
     def refresh_session(self):
         """刷新会话ID，使旧二维码失效"""
         self.session_id = str(uuid.uuid4())[:8]
+        self.invalidate_host_init()
         return self.session_id
     
-    def get_user_names(self) -> Set[str]:
-        """获取所有已注册的用户名"""
-        return {u["name"].lower() for u in self.users.values()}
-    
     def is_name_taken(self, name: str) -> bool:
         """检查用户名是否已被使用"""
-        return name.lower().strip() in self.get_user_names()
-    
+        return name.lower().strip() in self.names_to_token
+
     def get_token_by_name(self, name: str) -> Optional[str]:
         """根据用户名获取token"""
-        name_lower = name.lower().strip()
-        for token, user in self.users.items():
-            if user["name"].lower() == name_lower:
-                return token
-        return None
+        return self.names_to_token.get(name.lower().strip())
+
+    def invalidate_host_init(self):
+        """游戏状态（状态/轮次/选项/会话）变化后使init缓存失效"""
+        self._host_init_text = None
+
+    def invalidate_users_snapshot(self):
+        """用户状态变化后使快照失效（init消息包含用户列表，一并失效）"""
+        self._users_snapshot = None
+        self._host_init_text = None
+
+    def users_snapshot(self) -> List[dict]:
+        """全量用户快照（多个主持人连接共享同一份，避免重复构建）"""
+        if self._users_snapshot is None:
+            self._users_snapshot = [
+                {
+                    "token": token,
+                    "name": u.name,
+                    "voted": u.voted,
+                    "eliminated": u.eliminated
+                }
+                for token, u in self.users.items()
+            ]
+        return self._users_snapshot
+
+    def host_init_text(self) -> str:
+        """主持人init消息的序列化文本（多个主持人连接共享，变化后惰性重建）"""
+        if self._host_init_text is None:
+            self._host_init_text = orjson.dumps({
+                "type": "init",
+                "data": {
+                    "status": self.game_status,
+                    "round": self.round,
+                    "options": list(self.options.values()),
+                    "session_id": self.session_id,
+                    "users": self.users_snapshot()
+                }
+            }).decode()
+        return self._host_init_text
 
 
 # 全局数据存储实例
@@ -162,63 +220,146 @@ store = DataStore()
 
 # ==================== WebSocket 连接管理 ====================
 
+class _Connection:
+    """单个WebSocket连接：发送队列 + 专属中继任务"""
+    __slots__ = ("websocket", "queue", "task")
+
+    def __init__(self, websocket: WebSocket, queue: "asyncio.Queue[str]", task: asyncio.Task):
+        self.websocket = websocket
+        self.queue = queue
+        self.task = task
+
+
 class ConnectionManager:
     """WebSocket连接管理器"""
+
+    # 单次发送超时（秒）
+    SEND_TIMEOUT = 5.0
+    # 并发发送上限，避免大量连接时同时写入过多socket
+    MAX_CONCURRENT_SENDS = 100
+    # 每个连接的发送队列长度，积压超过即视为失联
+    QUEUE_MAXSIZE = 32
+    # 广播时每入队这么多连接就让出一次事件循环，避免大广播饿死其他请求
+    BROADCAST_BATCH_SIZE = 50
+
     def __init__(self):
-        # 主持人连接
-        self.host_connections: List[WebSocket] = []
-        # 用户连接: {token: websocket}
-        self.user_connections: Dict[str, WebSocket] = {}
-    
+        # 主持人连接: {websocket: _Connection}
+        self.host_connections: Dict[WebSocket, _Connection] = {}
+        # 用户连接: {token: _Connection}
+        self.user_connections: Dict[str, _Connection] = {}
+        # 并发发送信号量
+        self._send_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_SENDS)
+
+    @staticmethod
+    def encode(message: dict) -> str:
+        """用orjson将消息序列化为JSON文本（广播时只编码一次）"""
+        # 前端用 JSON.parse(event.data) 解析文本帧，因此发送文本而非二进制
+        return orjson.dumps(message).decode()
+
+    async def _relay(self, websocket: WebSocket, queue: "asyncio.Queue[str]", cleanup):
+        """中继任务：从队列取消息逐条发送，慢客户端只阻塞自己的队列
+
+        发送出错时自行从连接表中移除，广播路径无需再做清理。
+        """
+        try:
+            while True:
+                text = await queue.get()
+                async with self._send_semaphore:
+                    await asyncio.wait_for(websocket.send_text(text), timeout=self.SEND_TIMEOUT)
+        except Exception:
+            cleanup()
+
+    def _new_connection(self, websocket: WebSocket, cleanup) -> _Connection:
+        """为连接创建发送队列和中继任务，cleanup在发送失败时移除该连接"""
+        queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=self.QUEUE_MAXSIZE)
+        task = asyncio.create_task(self._relay(websocket, queue, cleanup))
+        return _Connection(websocket, queue, task)
+
+    @staticmethod
+    def _enqueue(conn: _Connection, text: str) -> bool:
+        """非阻塞入队，返回是否成功；队列满说明客户端已失联"""
+        try:
+            conn.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
     async def connect_host(self, websocket: WebSocket):
         """主持人连接"""
         await websocket.accept()
-        self.host_connections.append(websocket)
-    
+        self.host_connections[websocket] = self._new_connection(
+            websocket, lambda: self.host_connections.pop(websocket, None))
+
     async def disconnect_host(self, websocket: WebSocket):
         """主持人断开"""
-        if websocket in self.host_connections:
-            self.host_connections.remove(websocket)
-    
+        conn = self.host_connections.pop(websocket, None)
+        if conn:
+            conn.task.cancel()
+
     async def connect_user(self, websocket: WebSocket, token: str):
         """用户连接"""
         await websocket.accept()
-        self.user_connections[token] = websocket
-    
+        self.user_connections[token] = self._new_connection(
+            websocket, lambda: self.user_connections.pop(token, None))
+
     async def disconnect_user(self, token: str):
         """用户断开"""
-        if token in self.user_connections:
-            del self.user_connections[token]
-    
+        conn = self.user_connections.pop(token, None)
+        if conn:
+            conn.task.cancel()
+
+    async def _broadcast_text(self, connections: dict, text: str) -> list:
+        """把同一条消息入队给一批连接，分批让出事件循环；返回失联的key"""
+        dead = []
+        items = list(connections.items())
+        for i, (key, conn) in enumerate(items):
+            if i and i % self.BROADCAST_BATCH_SIZE == 0:
+                await asyncio.sleep(0)
+            if not self._enqueue(conn, text):
+                dead.append(key)
+        return dead
+
+    async def broadcast_text_to_hosts(self, text: str):
+        """广播已序列化的消息给所有主持人（非阻塞入队）"""
+        for ws in await self._broadcast_text(self.host_connections, text):
+            await self.disconnect_host(ws)
+
     async def broadcast_to_hosts(self, message: dict):
-        """广播给所有主持人"""
-        disconnected = []
-        for connection in self.host_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(connection)
-        for conn in disconnected:
-            self.host_connections.remove(conn)
-    
+        """广播给所有主持人（序列化一次）"""
+        if not self.host_connections:
+            return
+        await self.broadcast_text_to_hosts(self.encode(message))
+
+    async def broadcast_text_to_users(self, text: str):
+        """广播已序列化的消息给所有用户（非阻塞入队）"""
+        for token in await self._broadcast_text(self.user_connections, text):
+            await self.disconnect_user(token)
+
     async def broadcast_to_users(self, message: dict):
-        """广播给所有用户"""
-        disconnected = []
-        for token, connection in self.user_connections.items():
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(token)
-        for token in disconnected:
-            del self.user_connections[token]
-    
+        """广播给所有用户（序列化一次）"""
+        if not self.user_connections:
+            return
+        await self.broadcast_text_to_users(self.encode(message))
+
+    async def send_text_to_user(self, token: str, text: str):
+        """发送已序列化的消息给特定用户（循环群发时配合encode复用）"""
+        conn = self.user_connections.get(token)
+        if conn and not self._enqueue(conn, text):
+            await self.disconnect_user(token)
+
+    async def send_text_to_users(self, tokens, text: str):
+        """将同一条已序列化消息群发给指定用户（纯入队循环，不逐个await）"""
+        dead = []
+        for token in tokens:
+            conn = self.user_connections.get(token)
+            if conn and not self._enqueue(conn, text):
+                dead.append(token)
+        for token in dead:
+            await self.disconnect_user(token)
+
     async def send_to_user(self, token: str, message: dict):
         """发送给特定用户"""
-        if token in self.user_connections:
-            try:
-                await self.user_connections[token].send_json(message)
-            except Exception:
-                del self.user_connections[token]
+        await self.send_text_to_user(token, self.encode(message))
 
 
 # 全局连接管理器
@@ -237,7 +378,8 @@ app = FastAPI(
     title="二维码投票系统",
     description="实时互动投票系统后端API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS 配置
@@ -264,9 +406,9 @@ async def get_config():
     return {
         "status": store.game_status,
         "round": store.round,
-        "options": [opt.model_dump() for opt in store.options.values()],
-        "user_count": len([u for u in store.users.values() if not u.get("eliminated", False)]),
-        "voted_count": len([u for u in store.users.values() if u.get("voted", False) and not u.get("eliminated", False)]),
+        "options": list(store.options.values()),
+        "user_count": store.active_count,
+        "voted_count": store.voted_count,
         "session_id": store.session_id
     }
 
@@ -299,39 +441,39 @@ async def register_user(request: UserRegisterRequest):
         if request.session_id and request.session_id != store.session_id:
             raise HTTPException(status_code=400, detail="二维码已过期，请扫描最新二维码")
         
+        # 小写键只计算一次，查重和建索引共用
+        name_key = request.name.lower().strip()
+
         # 检查用户名是否已存在，如果存在则返回原有token和状态
-        existing_token = store.get_token_by_name(request.name)
+        existing_token = store.names_to_token.get(name_key)
         if existing_token:
             user = store.users[existing_token]
             # 获取当前选项
             options = None
             if store.game_status == "voting":
-                options = [{"id": opt.id, "name": opt.name} for opt in store.options.values()]
+                options = [{"id": opt["id"], "name": opt["name"]} for opt in store.options.values()]
             
             return UserRegisterResponse(
                 success=True,
                 message="欢迎回来",
                 token=existing_token,
-                user_name=user["name"],
+                user_name=user.name,
                 options=options
             )
         
-        # 新用户：生成唯一token
-        token = str(uuid.uuid4())
+        # 新用户：生成唯一token（128位随机，URL安全无连字符）
+        token = secrets.token_urlsafe(16)
         
         # 存储用户信息
-        store.users[token] = {
-            "name": request.name,
-            "voted": False,
-            "vote_option": None,
-            "eliminated": False,
-            "joined_at": datetime.now().isoformat()
-        }
+        store.users[token] = UserRecord(request.name, datetime.now().isoformat())
+        store.names_to_token[name_key] = token
+        store.active_count += 1
+        store.invalidate_users_snapshot()
         
         # 获取当前选项
         options = None
         if store.game_status == "voting":
-            options = [{"id": opt.id, "name": opt.name} for opt in store.options.values()]
+            options = [{"id": opt["id"], "name": opt["name"]} for opt in store.options.values()]
         
         # 通知主持人有新用户加入
         await manager.broadcast_to_hosts({
@@ -339,7 +481,7 @@ async def register_user(request: UserRegisterRequest):
             "data": {
                 "token": token,
                 "name": request.name,
-                "user_count": len([u for u in store.users.values() if not u.get("eliminated", False)])
+                "user_count": store.active_count
             }
         })
         
@@ -365,20 +507,20 @@ async def get_user_status(token: str):
     user = store.users[token]
     options = None
     if store.game_status == "voting":
-        options = [{"id": opt.id, "name": opt.name} for opt in store.options.values()]
+        options = [{"id": opt["id"], "name": opt["name"]} for opt in store.options.values()]
     
     return {
-        "name": user["name"],
-        "voted": user["voted"],
-        "vote_option": user["vote_option"],
-        "eliminated": user.get("eliminated", False),
+        "name": user.name,
+        "voted": user.voted,
+        "vote_option": user.vote_option,
+        "eliminated": user.eliminated,
         "game_status": store.game_status,
         "round": store.round,
         "options": options
     }
 
 
-@app.post("/api/vote", response_model=VoteResponse)
+@app.post("/api/vote")
 async def submit_vote(request: VoteRequest):
     """提交投票"""
     # 校验用户
@@ -388,11 +530,11 @@ async def submit_vote(request: VoteRequest):
     user = store.users[request.token]
     
     # 校验用户是否被淘汰
-    if user.get("eliminated", False):
+    if user.eliminated:
         raise HTTPException(status_code=403, detail="您已被淘汰，无法投票")
     
     # 校验是否已投票
-    if user["voted"]:
+    if user.voted:
         raise HTTPException(status_code=400, detail="您已经投过票了")
     
     # 校验游戏状态
@@ -404,22 +546,24 @@ async def submit_vote(request: VoteRequest):
         raise HTTPException(status_code=400, detail="无效的选项")
     
     # 更新投票
-    store.options[request.option_id].votes += 1
-    user["voted"] = True
-    user["vote_option"] = request.option_id
+    store.options[request.option_id]["votes"] += 1
+    user.voted = True
+    user.vote_option = request.option_id
+    store.voted_count += 1
+    store.invalidate_users_snapshot()
     
     # 广播投票更新给主持人
     await manager.broadcast_to_hosts({
         "type": "vote_update",
         "data": {
-            "options": [opt.model_dump() for opt in store.options.values()],
-            "voted_count": len([u for u in store.users.values() if u.get("voted", False) and not u.get("eliminated", False)]),
-            "user_count": len([u for u in store.users.values() if not u.get("eliminated", False)]),
+            "options": list(store.options.values()),
+            "voted_count": store.voted_count,
+            "user_count": store.active_count,
             "voted_token": request.token  # 新增：投票用户的token
         }
     })
     
-    return VoteResponse(success=True, message="投票成功")
+    return {"success": True, "message": "投票成功"}
 
 
 @app.get("/api/results")
@@ -428,13 +572,13 @@ async def get_results():
     return {
         "round": store.round,
         "status": store.game_status,
-        "options": [opt.model_dump() for opt in store.options.values()],
-        "total_votes": sum(opt.votes for opt in store.options.values()),
+        "options": list(store.options.values()),
+        "total_votes": sum(opt["votes"] for opt in store.options.values()),
         "users": [
             {
-                "name": u["name"],
-                "voted": u["voted"],
-                "eliminated": u.get("eliminated", False)
+                "name": u.name,
+                "voted": u.voted,
+                "eliminated": u.eliminated
             }
             for u in store.users.values()
         ]
@@ -446,8 +590,9 @@ async def get_results():
 @app.get("/api/host/round-config")
 async def get_round_config():
     """获取当前轮次的预设配置"""
-    preset_options = get_round_options(store.round)
-    preset_title = get_round_title(store.round)
+    entry = get_round_entry(store.round)
+    preset_options = entry.get("options")
+    preset_title = entry.get("title")
     
     return {
         "round": store.round,
@@ -471,18 +616,20 @@ async def load_preset_options():
     
     # 重置用户投票状态
     for user in store.users.values():
-        if not user.get("eliminated", False):
-            user["voted"] = False
-            user["vote_option"] = None
+        if not user.eliminated:
+            user.voted = False
+            user.vote_option = None
+    store.voted_count = 0
+    store.invalidate_users_snapshot()
     
     # 创建预设选项
     for i, name in enumerate(preset_options):
-        option_id = f"option_{i+1}"
-        store.options[option_id] = VoteOption(id=option_id, name=name)
+        option_id = i + 1
+        store.options[option_id] = {"id": option_id, "name": name, "votes": 0}
     
     return {
         "success": True,
-        "options": [opt.model_dump() for opt in store.options.values()],
+        "options": list(store.options.values()),
         "message": f"已加载第 {store.round} 轮预设选项"
     }
 
@@ -495,18 +642,20 @@ async def create_options(request: CreateOptionsRequest):
     
     # 重置用户投票状态
     for user in store.users.values():
-        if not user.get("eliminated", False):
-            user["voted"] = False
-            user["vote_option"] = None
+        if not user.eliminated:
+            user.voted = False
+            user.vote_option = None
+    store.voted_count = 0
+    store.invalidate_users_snapshot()
     
     # 创建新选项
     for i, name in enumerate(request.options):
-        option_id = f"option_{i+1}"
-        store.options[option_id] = VoteOption(id=option_id, name=name)
+        option_id = i + 1
+        store.options[option_id] = {"id": option_id, "name": name, "votes": 0}
     
     return {
         "success": True,
-        "options": [opt.model_dump() for opt in store.options.values()]
+        "options": list(store.options.values())
     }
 
 
@@ -517,13 +666,14 @@ async def start_voting():
         raise HTTPException(status_code=400, detail="请先设置投票选项")
     
     store.game_status = "voting"
+    store.invalidate_host_init()
     
     # 广播给所有用户
     await manager.broadcast_to_users({
         "type": "voting_started",
         "data": {
             "round": store.round,
-            "options": [{"id": opt.id, "name": opt.name} for opt in store.options.values()]
+            "options": [{"id": opt["id"], "name": opt["name"]} for opt in store.options.values()]
         }
     })
     
@@ -543,9 +693,10 @@ async def end_voting():
         raise HTTPException(status_code=400, detail="当前不在投票阶段")
     
     store.game_status = "result"
+    store.invalidate_host_init()
     
     # 获取结果
-    results = [opt.model_dump() for opt in store.options.values()]
+    results = list(store.options.values())
     
     # 广播给所有用户
     await manager.broadcast_to_users({
@@ -571,57 +722,53 @@ async def next_round(request: NextRoundRequest):
     if store.game_status != "result":
         raise HTTPException(status_code=400, detail="请先结束当前投票")
     
-    # 获取所有选项的票数
-    vote_counts = [opt.votes for opt in store.options.values()]
-    
+    # 单次遍历选项：记录本轮选项信息、票数集合与最高票
+    round_options = []
+    vote_values = set()
+    max_votes = 0
+    for opt in store.options.values():
+        votes = opt["votes"]
+        round_options.append({"name": opt["name"], "votes": votes})
+        vote_values.add(votes)
+        if votes > max_votes:
+            max_votes = votes
+
     # 检查是否平局（所有选项票数相同）
-    is_tie = len(set(vote_counts)) == 1 and vote_counts[0] > 0
-    
-    eliminated_tokens = []
-    survivors = []  # 胜出者
-    
-    # 记录本轮选项信息
-    round_options = [{"name": opt.name, "votes": opt.votes} for opt in store.options.values()]
-    
+    is_tie = len(vote_values) == 1 and max_votes > 0
+
+    # 多数派选项集合（O(1)成员判断）；平局时为空，只淘汰未投票者
     if is_tie:
-        # 平局：只淘汰未投票的用户
-        for token, user in store.users.items():
-            if user.get("eliminated", False):
-                continue
-            # 没有投票的用户被淘汰
-            if not user.get("voted", False):
-                user["eliminated"] = True
-                store.eliminated_users.add(token)
-                eliminated_tokens.append(token)
-            else:
-                survivors.append(user["name"])
+        majority_options = set()
     else:
-        # 非平局：找出得票最多的选项（多数派）
-        max_votes = max(opt.votes for opt in store.options.values())
-        majority_options = [opt.id for opt in store.options.values() if opt.votes == max_votes]
-        
-        # 淘汰规则：
-        # 1. 投了多数派的用户被淘汰
-        # 2. 没有投票的用户也被淘汰
-        for token, user in store.users.items():
-            if user.get("eliminated", False):
-                continue  # 已经被淘汰的跳过
-            
-            # 没有投票的用户被淘汰
-            if not user.get("voted", False):
-                user["eliminated"] = True
-                store.eliminated_users.add(token)
-                eliminated_tokens.append(token)
-            # 投了多数派的用户被淘汰
-            elif user.get("vote_option") in majority_options:
-                user["eliminated"] = True
-                store.eliminated_users.add(token)
-                eliminated_tokens.append(token)
-            else:
-                survivors.append(user["name"])
-    
+        majority_options = {oid for oid, opt in store.options.items() if opt["votes"] == max_votes}
+
+    eliminated_tokens = []
+    eliminated_names = []
+    survivors = []  # 胜出者
+
+    # 淘汰规则（单次遍历全体用户）：
+    # 1. 没有投票的用户被淘汰
+    # 2. 非平局时投了多数派的用户被淘汰
+    # 热循环：绑定方法提前取出局部变量，减少每次迭代的属性查找
+    eliminated_add = store.eliminated_users.add
+    tokens_append = eliminated_tokens.append
+    names_append = eliminated_names.append
+    survivors_append = survivors.append
+    eliminated_delta = 0
+    for token, user in store.users.items():
+        if user.eliminated:
+            continue  # 已经被淘汰的跳过
+        if not user.voted or user.vote_option in majority_options:
+            user.eliminated = True
+            eliminated_add(token)
+            tokens_append(token)
+            names_append(user.name)
+            eliminated_delta += 1
+        else:
+            survivors_append(user.name)
+    store.active_count -= eliminated_delta
+
     # 记录本轮历史
-    eliminated_names = [store.users[t]["name"] for t in eliminated_tokens]
     store.round_history.append({
         "round": store.round,
         "options": round_options,
@@ -630,12 +777,11 @@ async def next_round(request: NextRoundRequest):
         "eliminated": eliminated_names
     })
     
-    # 通知被淘汰的用户
-    for token in eliminated_tokens:
-        await manager.send_to_user(token, {
-            "type": "eliminated",
-            "data": {"message": "您已被淘汰"}
-        })
+    # 通知被淘汰的用户（消息相同，序列化一次后批量入队）
+    await manager.send_text_to_users(eliminated_tokens, manager.encode({
+        "type": "eliminated",
+        "data": {"message": "您已被淘汰"}
+    }))
     
     # 重置投票状态
     store.round += 1
@@ -643,15 +789,17 @@ async def next_round(request: NextRoundRequest):
     store.options.clear()
     
     for user in store.users.values():
-        if not user.get("eliminated", False):
-            user["voted"] = False
-            user["vote_option"] = None
+        if not user.eliminated:
+            user.voted = False
+            user.vote_option = None
+    store.voted_count = 0
+    store.invalidate_users_snapshot()
     
     # 如果提供了新选项，直接设置
     if request.new_options:
         for i, name in enumerate(request.new_options):
-            option_id = f"option_{i+1}"
-            store.options[option_id] = VoteOption(id=option_id, name=name)
+            option_id = i + 1
+            store.options[option_id] = {"id": option_id, "name": name, "votes": 0}
     
     # 广播给未被淘汰的用户
     await manager.broadcast_to_users({
@@ -669,7 +817,7 @@ async def next_round(request: NextRoundRequest):
         "data": {
             "round": store.round,
             "eliminated_tokens": eliminated_tokens,
-            "active_users": len([u for u in store.users.values() if not u.get("eliminated", False)]),
+            "active_users": store.active_count,
             "is_tie": is_tie
         }
     })
@@ -678,7 +826,7 @@ async def next_round(request: NextRoundRequest):
         "success": True,
         "round": store.round,
         "eliminated_count": len(eliminated_tokens),
-        "active_users": len([u for u in store.users.values() if not u.get("eliminated", False)]),
+        "active_users": store.active_count,
         "is_tie": is_tie,
         "message": "平局！本轮不淘汰任何投票者" if is_tie else f"淘汰了 {len(eliminated_tokens)} 人"
     }
@@ -688,17 +836,14 @@ async def next_round(request: NextRoundRequest):
 async def reset_game():
     """重置游戏"""
     store.reset()
-    
-    # 广播给所有连接
-    await manager.broadcast_to_users({
-        "type": "game_reset",
-        "data": {"message": "游戏已重置"}
-    })
-    
-    await manager.broadcast_to_hosts({
+
+    # 广播给所有连接（主持人和用户消息相同，序列化一次共用）
+    reset_text = manager.encode({
         "type": "game_reset",
         "data": {"message": "游戏已重置"}
     })
+    await manager.broadcast_text_to_users(reset_text)
+    await manager.broadcast_text_to_hosts(reset_text)
     
     return {"success": True, "message": "游戏已重置"}
 
@@ -706,15 +851,16 @@ async def reset_game():
 @app.get("/api/host/users")
 async def get_users():
     """获取所有用户列表"""
-    users = []
-    for token, user in store.users.items():
-        users.append({
+    # 预分配列表，避免追加过程中的多次扩容
+    users = [None] * len(store.users)
+    for i, (token, user) in enumerate(store.users.items()):
+        users[i] = {
             "token": token,
-            "name": user["name"],
-            "voted": user["voted"],
-            "eliminated": user.get("eliminated", False),
-            "vote_option": user.get("vote_option")
-        })
+            "name": user.name,
+            "voted": user.voted,
+            "eliminated": user.eliminated,
+            "vote_option": user.vote_option
+        }
     return {"users": users, "total": len(users)}
 
 
@@ -735,25 +881,8 @@ async def websocket_host(websocket: WebSocket):
     """主持人WebSocket连接"""
     await manager.connect_host(websocket)
     try:
-        # 发送当前状态
-        await websocket.send_json({
-            "type": "init",
-            "data": {
-                "status": store.game_status,
-                "round": store.round,
-                "options": [opt.model_dump() for opt in store.options.values()],
-                "session_id": store.session_id,
-                "users": [
-                    {
-                        "token": token,
-                        "name": u["name"],
-                        "voted": u["voted"],
-                        "eliminated": u.get("eliminated", False)
-                    }
-                    for token, u in store.users.items()
-                ]
-            }
-        })
+        # 发送当前状态（缓存的序列化文本，所有主持人连接共享）
+        await websocket.send_text(store.host_init_text())
         
         # 保持连接
         while True:
@@ -778,7 +907,7 @@ async def websocket_user(websocket: WebSocket, token: str):
         # 发送当前状态
         options = None
         if store.game_status == "voting":
-            options = [{"id": opt.id, "name": opt.name} for opt in store.options.values()]
+            options = [{"id": opt["id"], "name": opt["name"]} for opt in store.options.values()]
         
         await websocket.send_json({
             "type": "init",
@@ -786,8 +915,8 @@ async def websocket_user(websocket: WebSocket, token: str):
                 "status": store.game_status,
                 "round": store.round,
                 "options": options,
-                "voted": user["voted"],
-                "eliminated": user.get("eliminated", False)
+                "voted": user.voted,
+                "eliminated": user.eliminated
             }
         })
         